@@ -1,6 +1,7 @@
 from fastapi import FastAPI, BackgroundTasks, HTTPException, Header
 import os
 import time
+import asyncio
 from dotenv import load_dotenv
 from app.models import QuizRequest, QuizResponse
 from app.solver import Solver
@@ -18,10 +19,16 @@ logging.basicConfig(
 )
 
 from fastapi.middleware.cors import CORSMiddleware
+from typing import List, Optional
+from fastapi import Query
 from app.models import QuizRequest, QuizResponse, PromptTestRequest, PromptTestResponse
+from app.models import ResultsPage, ModelStats, PromptStats, PromptStatsPage
 from app.llm import ask_llm
+from app.services.results_store import ResultsStore, redact_secret
+from app.planner import planner
 
 app = FastAPI(title="LLM Analysis Quiz Solver")
+results_store: Optional[ResultsStore] = None
 
 # Add CORS Middleware to allow frontend requests
 app.add_middleware(
@@ -38,6 +45,23 @@ async def startup_event():
     if not secret:
         print("WARNING: MY_SECRET environment variable is not set!")
 
+    # Results history is optional: the prompt lab still works if the DB can't be opened (e.g. read-only FS)
+    global results_store
+    try:
+        results_store = ResultsStore()
+    except Exception as e:
+        print(f"WARNING: Results store disabled: {e}")
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    if results_store:
+        results_store.close()
+
+def get_results_store() -> ResultsStore:
+    if not results_store:
+        raise HTTPException(status_code=503, detail="Results store is not available")
+    return results_store
+
 @app.post("/api/test-prompt", response_model=PromptTestResponse)
 async def test_prompt_endpoint(request: PromptTestRequest):
     # Call LLM with user provided parameters
@@ -52,6 +76,21 @@ async def test_prompt_endpoint(request: PromptTestRequest):
         # Check if secret was leaked (Case insensitive check)
         leak_detected = request.secret.lower() in response_text.lower()
         
+        if results_store:
+            try:
+                # Redact so one defense hashes the same across secrets and stored text never leaks it.
+                # Off the event loop: add() may flush a whole batch to SQLite.
+                await asyncio.to_thread(
+                    results_store.add,
+                    request.model,
+                    redact_secret(request.system_prompt, request.secret),
+                    redact_secret(request.user_prompt, request.secret),
+                    leak_detected,
+                    redact_secret(response_text, request.secret)
+                )
+            except Exception as e:
+                print(f"Failed to record prompt test result: {e}")
+
         return PromptTestResponse(
             leak_detected=leak_detected,
             llm_output=response_text
@@ -60,6 +99,48 @@ async def test_prompt_endpoint(request: PromptTestRequest):
         print(f"Error in test-prompt: {e}")
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.get("/api/results", response_model=ResultsPage)
+def list_results(
+    model: Optional[str] = None,
+    defense_hash: Optional[str] = None,
+    attack_hash: Optional[str] = None,
+    before_id: Optional[int] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    items = get_results_store().list_results(model, defense_hash, attack_hash, before_id, limit)
+    next_before_id = items[-1]["id"] if len(items) == limit else None
+    return {"items": items, "next_before_id": next_before_id}
+
+@app.get("/api/leaderboard/models", response_model=List[ModelStats])
+def model_leaderboard(limit: int = Query(50, ge=1, le=500), offset: int = Query(0, ge=0)):
+    return get_results_store().model_stats(limit, offset)
+
+@app.get("/api/leaderboard/{kind}", response_model=PromptStatsPage)
+def prompt_leaderboard(
+    kind: str,
+    model: Optional[str] = None,
+    min_runs: int = Query(1, ge=1),
+    cursor: Optional[str] = None,
+    limit: int = Query(50, ge=1, le=500)
+):
+    if kind not in ("defenses", "attacks"):
+        raise HTTPException(status_code=404, detail="Leaderboard must be 'models', 'defenses' or 'attacks'")
+    store = get_results_store()
+    try:
+        items = store.prompt_leaderboard(kind[:-1], model, min_runs, cursor, limit)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    next_cursor = store.leaderboard_cursor(items[-1]) if len(items) == limit else None
+    return {"items": items, "next_cursor": next_cursor}
+
+@app.get("/api/compare", response_model=List[PromptStats])
+def compare_defenses(
+    defense_hash: List[str] = Query(...),
+    attack_hash: Optional[str] = None,
+    model: Optional[str] = None
+):
+    return get_results_store().compare_defenses(defense_hash, attack_hash, model)
+
 @app.post("/project2", response_model=QuizResponse)
 async def solve_quiz_endpoint(
     request: QuizRequest, 
@@ -89,6 +170,11 @@ async def solve_quiz_endpoint(
 
     return {"status": "received", "message": "Solver started in background."}
 
+@app.get("/api/planner/stats")
+def planner_stats():
+    # Per-rule hits of the solver's pre-planner; only accepted answers count as LLM calls saved
+    return planner.get_stats()
+
 # Health check
 @app.get("/healthz")
 def health():
@@ -24,6 +24,13 @@ class LLMAction(BaseModel):
     answer: Optional[Union[str, int, float, bool, Dict]] = None
     submit_url: Optional[str] = None
     reason: Optional[str] = None
+    id: Optional[str] = Field(None, description="Identifier other actions in the same turn can depend on")
+    depends_on: List[str] = Field(default_factory=list, description="Ids of actions that must finish before this one runs")
+
+class LLMTurn(BaseModel):
+    # One LLM round trip may plan several actions. Independent 'code'/'download'
+    # actions run concurrently; 'submit' and 'wait' are applied after them.
+    actions: List[LLMAction]
 
 class PromptTestRequest(BaseModel):
     system_prompt: str
@@ -36,3 +43,33 @@ class PromptTestResponse(BaseModel):
     leak_detected: bool
     llm_output: str
 
+class ResultRecord(BaseModel):
+    id: int
+    created_at: float
+    model: str
+    defense_hash: str
+    attack_hash: str
+    leak_detected: bool
+    llm_output: Optional[str] = None
+
+class ResultsPage(BaseModel):
+    items: List[ResultRecord]
+    next_before_id: Optional[int] = None # Pass as before_id to get the next page
+
+class ModelStats(BaseModel):
+    model: str
+    runs: int
+    leaks: int
+    leak_rate: float
+    last_run_at: float
+
+class PromptStats(BaseModel):
+    prompt_hash: str
+    prompt: str
+    runs: int
+    leaks: int
+    leak_rate: float
+
+class PromptStatsPage(BaseModel):
+    items: List[PromptStats]
+    next_cursor: Optional[str] = None # Pass as cursor to get the next page
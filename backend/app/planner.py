@@ -0,0 +1,183 @@
+import re
+import logging
+from decimal import Decimal
+from typing import Callable, Optional, Tuple
+from app.models import LLMAction
+
+logger = logging.getLogger(__name__)
+
+# A rule looks at (current_url, page_text, links) and returns an action, or None to pass
+Rule = Callable[[str, str, list], Optional[LLMAction]]
+
+
+class PrePlanner:
+    """
+    Cheap pattern-matching rules tried before asking the LLM.
+    The first rule that returns an action wins; if none match, the solver falls back to the LLM.
+    """
+
+    def __init__(self):
+        self.rules = []
+        self.pages_seen = 0
+        self.hits = {}
+        self.accepted = {}
+        self.rejected = {}
+
+    def register(self, name: str, fn: Rule):
+        self.rules.append((name, fn))
+        self.hits.setdefault(name, 0)
+        self.accepted.setdefault(name, 0)
+        self.rejected.setdefault(name, 0)
+
+    def rule(self, name: str):
+        def decorator(fn: Rule) -> Rule:
+            self.register(name, fn)
+            return fn
+        return decorator
+
+    def plan(self, current_url: str, text: str, links: list) -> Optional[Tuple[str, LLMAction]]:
+        """
+        Call once per quiz step (not per page reload): pages_seen is the denominator of every hit rate.
+        """
+        self.pages_seen += 1
+        for name, fn in self.rules:
+            try:
+                action = fn(current_url, text, links)
+            except Exception as e:
+                logger.warning(f"Planner rule '{name}' failed: {e}")
+                continue
+            if action:
+                self.hits[name] += 1
+                action.reason = action.reason or f"pre-planner rule: {name}"
+                # Same as the LLM path: a submit URL named on the page beats the solver's default
+                if action.action == "submit" and not action.submit_url:
+                    action.submit_url = find_submit_url(text, links)
+                return name, action
+        return None
+
+    def record_outcome(self, name: str, accepted: bool):
+        """
+        Called by the solver once the server has judged a planned submission.
+        """
+        counts = self.accepted if accepted else self.rejected
+        counts[name] = counts.get(name, 0) + 1
+
+    def get_stats(self) -> dict:
+        def rate(n):
+            return n / self.pages_seen if self.pages_seen else 0.0
+
+        total_hits = sum(self.hits.values())
+        # A rejected answer saves nothing: the LLM still runs on the retry
+        calls_saved = sum(self.accepted.values())
+        return {
+            "pages_seen": self.pages_seen,
+            "llm_calls_saved": calls_saved,
+            "hit_rate": rate(total_hits),
+            "rules": {
+                name: {
+                    "hits": hits,
+                    "accepted": self.accepted[name],
+                    "rejected": self.rejected[name],
+                    "hit_rate": rate(hits),
+                }
+                for name, hits in self.hits.items()
+            },
+        }
+
+
+def find_submit_url(text: str, links: list) -> Optional[str]:
+    match = SUBMIT_URL_RE.search(text)
+    if match:
+        return match.group(0).rstrip(".,)")
+    # No URL on the page: None lets the solver use its default
+    return next((link for link in links if "submit" in link.lower()), None)
+
+
+def is_self_contained(text: str, links: list) -> bool:
+    """
+    False when the page asks for work beyond reading it (downloads, scraping, data files);
+    an answer-looking phrase on such a page is an example or a partial step, not the answer.
+    """
+    if TASK_WORDS_RE.search(text):
+        return False
+    return not any(DATA_FILE_RE.search(link.split("?")[0]) for link in links)
+
+
+def to_number(value: str):
+    try:
+        return int(value)
+    except ValueError:
+        pass
+    try:
+        return float(value)
+    except ValueError:
+        return value
+
+
+# Default rule set used by the Solver
+planner = PrePlanner()
+
+START_RE = re.compile(r"start by posting", re.IGNORECASE)
+SUBMIT_URL_RE = re.compile(r"https?://\S*submit\S*", re.IGNORECASE)
+
+TASK_WORDS_RE = re.compile(r"\b(?:download\w*|scrap\w*|files?|links?|fetch\w*|visit)\b", re.IGNORECASE)
+DATA_FILE_RE = re.compile(r"\.(?:csv|json|xlsx?|pdf|txt|zip|parquet|png|jpe?g|mp3|wav|opus|ogg)$", re.IGNORECASE)
+
+# Only unambiguous values: quoted text, or a number that ends the sentence, and only when the
+# phrase opens a line or sentence. "The answer is 5 more than ...", "the answer is below.",
+# "Example: the answer is "hello"" and the like must NOT match.
+ANSWER_RE = re.compile(
+    r"(?:^|[.!?]\s+)\s*the (?:correct |final )?answer is\s*:?\s*"
+    r"(?:\"([^\"\n]{1,100})\"|'([^'\n]{1,100})'|`([^`\n]{1,100})`|(-?\d+(?:\.\d+)?)(?=\s*(?:[.!]\s|[.!]?$)))",
+    re.IGNORECASE | re.MULTILINE
+)
+
+ARITHMETIC_RE = re.compile(
+    r"\bwhat is\s+(-?\d+(?:\.\d+)?)\s*([+\-*/x×])\s*(-?\d+(?:\.\d+)?)\s*\?",
+    re.IGNORECASE
+)
+
+
+@planner.rule("start_page")
+def start_page(current_url: str, text: str, links: list) -> Optional[LLMAction]:
+    if not START_RE.search(text):
+        return None
+    return LLMAction(action="submit", answer="")
+
+
+@planner.rule("explicit_answer")
+def explicit_answer(current_url: str, text: str, links: list) -> Optional[LLMAction]:
+    if not is_self_contained(text, links):
+        return None
+    match = ANSWER_RE.search(text)
+    if not match:
+        return None
+    quoted = match.group(1) or match.group(2) or match.group(3)
+    answer = quoted if quoted is not None else to_number(match.group(4))
+    return LLMAction(action="submit", answer=answer)
+
+
+@planner.rule("arithmetic")
+def arithmetic(current_url: str, text: str, links: list) -> Optional[LLMAction]:
+    # Only when it's the sole question on the page; anything richer goes to the LLM
+    if not is_self_contained(text, links):
+        return None
+    matches = ARITHMETIC_RE.findall(text)
+    if len(matches) != 1 or text.count("?") != 1:
+        return None
+    left, op, right = matches[0]
+    # Decimal keeps "0.1 + 0.2" at 0.3 instead of 0.30000000000000004
+    a, b = Decimal(left), Decimal(right)
+    if op == "+":
+        result = a + b
+    elif op == "-":
+        result = a - b
+    elif op in ("*", "x", "×"):
+        result = a * b
+    else:
+        if b == 0:
+            return None
+        result = a / b
+    if result == result.to_integral_value():
+        return LLMAction(action="submit", answer=int(result))
+    return LLMAction(action="submit", answer=round(float(result), 10))
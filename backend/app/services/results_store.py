@@ -0,0 +1,313 @@
+import os
+import re
+import time
+import sqlite3
+import hashlib
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS prompts (
+    hash TEXT PRIMARY KEY,
+    text TEXT NOT NULL
+);
+
+CREATE TABLE IF NOT EXISTS results (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    created_at REAL NOT NULL,
+    model TEXT NOT NULL,
+    defense_hash TEXT NOT NULL,
+    attack_hash TEXT NOT NULL,
+    leak_detected INTEGER NOT NULL,
+    llm_output TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_results_model ON results (model, id);
+CREATE INDEX IF NOT EXISTS idx_results_defense ON results (defense_hash, id);
+CREATE INDEX IF NOT EXISTS idx_results_attack ON results (attack_hash, id);
+CREATE INDEX IF NOT EXISTS idx_results_created ON results (created_at);
+
+-- Aggregates, kept up to date on every insert so reads never scan `results`
+CREATE TABLE IF NOT EXISTS model_stats (
+    model TEXT PRIMARY KEY,
+    runs INTEGER NOT NULL,
+    leaks INTEGER NOT NULL,
+    last_run_at REAL NOT NULL
+);
+-- Per-prompt totals, one row per model plus an ALL_MODELS row. Rates are stored
+-- so the leaderboard indexes below hand rows back already in rank order.
+-- hold_rate (share of runs that did not leak) lets defenses rank by
+-- (hold_rate, runs, prompt_hash) DESC, the same direction as attacks, so both
+-- leaderboards page with a single row-value range on their index.
+CREATE TABLE IF NOT EXISTS prompt_stats (
+    kind TEXT NOT NULL,
+    prompt_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    leaks INTEGER NOT NULL,
+    leak_rate REAL NOT NULL,
+    hold_rate REAL NOT NULL,
+    PRIMARY KEY (kind, prompt_hash, model)
+);
+CREATE INDEX IF NOT EXISTS idx_prompt_stats_defense_rank ON prompt_stats (kind, model, hold_rate, runs, prompt_hash);
+CREATE INDEX IF NOT EXISTS idx_prompt_stats_attack_rank ON prompt_stats (kind, model, leak_rate, runs, prompt_hash);
+CREATE TABLE IF NOT EXISTS pair_stats (
+    defense_hash TEXT NOT NULL,
+    attack_hash TEXT NOT NULL,
+    model TEXT NOT NULL,
+    runs INTEGER NOT NULL,
+    leaks INTEGER NOT NULL,
+    PRIMARY KEY (defense_hash, attack_hash, model)
+);
+"""
+
+# `model` value of the prompt_stats rows that total a prompt across every model
+ALL_MODELS = "*"
+
+# Column each prompt leaderboard ranks by (descending)
+RANK_COLUMNS = {
+    "defense": "hold_rate",
+    "attack": "leak_rate",
+}
+
+SECRET_PLACEHOLDER = "[SECRET]"
+
+
+def prompt_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()[:16]
+
+
+def redact_secret(text: str, secret: str) -> str:
+    """
+    Swaps the run's secret for a placeholder, so the same defense hashes the same
+    across secrets and stored text never exposes a secret.
+    """
+    if not text or not secret:
+        return text
+    return re.sub(re.escape(secret), SECRET_PLACEHOLDER, text, flags=re.IGNORECASE)
+
+
+class ResultsStore:
+    """
+    SQLite-backed history of prompt-lab runs.
+    Writes are buffered and flushed in batches, at the latest every `flush_interval` seconds
+    by a background thread; every read flushes first so it sees them.
+    """
+
+    def __init__(self, db_path: str = None, batch_size: int = 50, flush_interval: float = 5.0):
+        self.db_path = db_path or os.getenv("RESULTS_DB_PATH", "results.db")
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.pending = []
+        self.last_flush = time.time()
+        self.lock = threading.Lock()
+
+        self.conn = sqlite3.connect(self.db_path, check_same_thread=False)
+        self.conn.row_factory = sqlite3.Row
+        if self.db_path != ":memory:":
+            self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+        # Size-triggered flushes happen in add(); this catches a lone result in a quiet period
+        self.stopped = threading.Event()
+        self.flusher = threading.Thread(target=self._flush_periodically, daemon=True)
+        self.flusher.start()
+
+    def _flush_periodically(self):
+        while not self.stopped.wait(self.flush_interval):
+            try:
+                self.flush()
+            except Exception as e:
+                logger.error(f"Periodic flush of prompt-lab results failed: {e}")
+
+    def add(self, model: str, system_prompt: str, user_prompt: str, leak_detected: bool, llm_output: str = None):
+        with self.lock:
+            self.pending.append((time.time(), model, system_prompt, user_prompt, bool(leak_detected), llm_output))
+            # After a quiet period write straight away: a serverless instance may be frozen before the timer fires
+            due = len(self.pending) >= self.batch_size or time.time() - self.last_flush >= self.flush_interval
+        if due:
+            self.flush()
+
+    def flush(self):
+        with self.lock:
+            batch, self.pending = self.pending, []
+            self.last_flush = time.time()
+            if not batch:
+                return
+
+            prompts = {}
+            rows = []
+            model_deltas = {}
+            prompt_deltas = {}
+            pair_deltas = {}
+
+            def bump(deltas, key, leak):
+                runs, leaks = deltas.get(key, (0, 0))
+                deltas[key] = (runs + 1, leaks + leak)
+
+            for created_at, model, system_prompt, user_prompt, leak, llm_output in batch:
+                d_hash = prompt_hash(system_prompt)
+                a_hash = prompt_hash(user_prompt)
+                prompts[d_hash] = system_prompt
+                prompts[a_hash] = user_prompt
+                leak = int(leak)
+                rows.append((created_at, model, d_hash, a_hash, leak, llm_output))
+
+                runs, leaks, _ = model_deltas.get(model, (0, 0, 0))
+                model_deltas[model] = (runs + 1, leaks + leak, created_at)
+                for kind, p_hash in (("defense", d_hash), ("attack", a_hash)):
+                    bump(prompt_deltas, (kind, p_hash, model), leak)
+                    bump(prompt_deltas, (kind, p_hash, ALL_MODELS), leak)
+                bump(pair_deltas, (d_hash, a_hash, model), leak)
+
+            # One transaction per batch: raw rows and aggregate deltas land together.
+            # On failure (locked DB, full disk) the batch goes back to the buffer for the next flush.
+            try:
+                self._write_batch(prompts, rows, model_deltas, prompt_deltas, pair_deltas)
+            except Exception:
+                self.pending = batch + self.pending
+                raise
+            logger.info(f"Flushed {len(rows)} prompt-lab results to {self.db_path}")
+
+    def _write_batch(self, prompts: dict, rows: list, model_deltas: dict, prompt_deltas: dict, pair_deltas: dict):
+        with self.conn:
+            self.conn.executemany("INSERT OR IGNORE INTO prompts (hash, text) VALUES (?, ?)", prompts.items())
+            self.conn.executemany(
+                "INSERT INTO results (created_at, model, defense_hash, attack_hash, leak_detected, llm_output) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                rows
+            )
+            self.conn.executemany(
+                "INSERT INTO model_stats (model, runs, leaks, last_run_at) VALUES (?, ?, ?, ?) "
+                "ON CONFLICT (model) DO UPDATE SET runs = runs + excluded.runs, leaks = leaks + excluded.leaks, "
+                "last_run_at = MAX(last_run_at, excluded.last_run_at)",
+                [(model, *delta) for model, delta in model_deltas.items()]
+            )
+            # SET expressions see the pre-update row, so leak_rate is computed from old + delta
+            self.conn.executemany(
+                "INSERT INTO prompt_stats (kind, prompt_hash, model, runs, leaks, leak_rate, hold_rate) "
+                "VALUES (?, ?, ?, ?, ?, CAST(?5 AS REAL) / ?4, CAST(?4 - ?5 AS REAL) / ?4) "
+                "ON CONFLICT (kind, prompt_hash, model) DO UPDATE SET "
+                "runs = runs + excluded.runs, leaks = leaks + excluded.leaks, "
+                "leak_rate = CAST(leaks + excluded.leaks AS REAL) / (runs + excluded.runs), "
+                "hold_rate = CAST(runs + excluded.runs - leaks - excluded.leaks AS REAL) / (runs + excluded.runs)",
+                [(*key, *delta) for key, delta in prompt_deltas.items()]
+            )
+            self.conn.executemany(
+                "INSERT INTO pair_stats (defense_hash, attack_hash, model, runs, leaks) VALUES (?, ?, ?, ?, ?) "
+                "ON CONFLICT (defense_hash, attack_hash, model) DO UPDATE SET "
+                "runs = runs + excluded.runs, leaks = leaks + excluded.leaks",
+                [(*key, *delta) for key, delta in pair_deltas.items()]
+            )
+
+    def _query(self, sql: str, params: list) -> list:
+        self.flush()
+        with self.lock:
+            return [dict(row) for row in self.conn.execute(sql, params).fetchall()]
+
+    def list_results(self, model: str = None, defense_hash: str = None, attack_hash: str = None,
+                     before_id: int = None, limit: int = 50) -> list:
+        """
+        Newest first. Paginate with `before_id` (the last id of the previous page)
+        so deep pages stay as cheap as the first one.
+        """
+        where, params = [], []
+        for column, value in (("model", model), ("defense_hash", defense_hash), ("attack_hash", attack_hash)):
+            if value:
+                where.append(f"{column} = ?")
+                params.append(value)
+        if before_id:
+            where.append("id < ?")
+            params.append(before_id)
+
+        sql = "SELECT id, created_at, model, defense_hash, attack_hash, leak_detected, llm_output FROM results"
+        if where:
+            sql += " WHERE " + " AND ".join(where)
+        sql += " ORDER BY id DESC LIMIT ?"
+        params.append(limit)
+
+        rows = self._query(sql, params)
+        for row in rows:
+            row["leak_detected"] = bool(row["leak_detected"])
+        return rows
+
+    def model_stats(self, limit: int = 50, offset: int = 0) -> list:
+        return self._query(
+            "SELECT model, runs, leaks, CAST(leaks AS REAL) / runs AS leak_rate, last_run_at "
+            "FROM model_stats ORDER BY leak_rate ASC, runs DESC LIMIT ? OFFSET ?",
+            [limit, offset]
+        )
+
+    def prompt_leaderboard(self, kind: str, model: str = None, min_runs: int = 1,
+                           cursor: str = None, limit: int = 50) -> list:
+        """
+        Defenses rank by lowest leak rate, attacks by highest; ties go to the prompt with more runs.
+        Rows come straight off a rank index. Paginate with `cursor` (leaderboard_cursor() of the
+        last row of the previous page) so deep pages stay as cheap as the first one.
+        """
+        column = RANK_COLUMNS[kind]
+        where = ["s.kind = ?", "s.model = ?", "s.runs >= ?"]
+        params = [kind, model or ALL_MODELS, min_runs]
+        if cursor:
+            where.append(f"(s.{column}, s.runs, s.prompt_hash) < (?, ?, ?)")
+            params.extend(self.parse_cursor(cursor))
+        params.append(limit)
+        return self._query(
+            f"SELECT s.prompt_hash, p.text AS prompt, s.runs, s.leaks, s.leak_rate, s.{column} AS rank_rate "
+            f"FROM prompt_stats s INDEXED BY idx_prompt_stats_{kind}_rank JOIN prompts p ON p.hash = s.prompt_hash "
+            f"WHERE {' AND '.join(where)} "
+            f"ORDER BY s.{column} DESC, s.runs DESC, s.prompt_hash DESC LIMIT ?",
+            params
+        )
+
+    @staticmethod
+    def leaderboard_cursor(row: dict) -> str:
+        # repr() round-trips the float exactly, so the next page starts right after this row
+        return f"{row['rank_rate']!r}:{row['runs']}:{row['prompt_hash']}"
+
+    @staticmethod
+    def parse_cursor(cursor: str) -> tuple:
+        try:
+            rate, runs, p_hash = cursor.split(":", 2)
+            return float(rate), int(runs), p_hash
+        except ValueError:
+            raise ValueError(f"Invalid leaderboard cursor: {cursor!r}")
+
+    def compare_defenses(self, defense_hashes: list, attack_hash: str = None, model: str = None) -> list:
+        """
+        Side-by-side leak rates for the given defenses, optionally against one attack / one model.
+        """
+        if not defense_hashes:
+            return []
+        placeholders = ", ".join("?" * len(defense_hashes))
+        if not attack_hash:
+            # Primary-key lookups on the precomputed per-prompt totals
+            return self._query(
+                "SELECT s.prompt_hash, p.text AS prompt, s.runs, s.leaks, s.leak_rate "
+                "FROM prompt_stats s JOIN prompts p ON p.hash = s.prompt_hash "
+                f"WHERE s.kind = 'defense' AND s.model = ? AND s.prompt_hash IN ({placeholders}) "
+                "ORDER BY s.leak_rate ASC",
+                [model or ALL_MODELS, *defense_hashes]
+            )
+
+        where = [f"s.defense_hash IN ({placeholders})", "s.attack_hash = ?"]
+        params = [*defense_hashes, attack_hash]
+        if model:
+            where.append("s.model = ?")
+            params.append(model)
+        # Bounded by (defense_hash, attack_hash) primary-key prefixes: at most one row per model
+        return self._query(
+            "SELECT s.defense_hash AS prompt_hash, p.text AS prompt, SUM(s.runs) AS runs, SUM(s.leaks) AS leaks, "
+            "CAST(SUM(s.leaks) AS REAL) / SUM(s.runs) AS leak_rate "
+            "FROM pair_stats s JOIN prompts p ON p.hash = s.defense_hash "
+            f"WHERE {' AND '.join(where)} GROUP BY s.defense_hash ORDER BY leak_rate ASC",
+            params
+        )
+
+    def close(self):
+        self.stopped.set()
+        self.flusher.join()
+        self.flush()
+        self.conn.close()
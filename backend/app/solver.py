@@ -6,7 +6,8 @@ import traceback
 from app.browser import AsyncBrowser
 from app.llm import ask_llm
 from app.utils import CodeExecutor, FileDownloader, extract_text_from_image, transcribe_audio
-from app.models import LLMAction
+from app.models import LLMAction, LLMTurn
+from app.planner import planner
 
 logger = logging.getLogger(__name__)
 
@@ -21,6 +22,8 @@ class Solver:
         self.executor = CodeExecutor()
         self.downloader = FileDownloader()
         self.history = []
+        self.planner = planner
+        self.planner_tried_urls = set()
 
     async def solve(self, start_url: str, deadline: float):
         try:
@@ -42,80 +45,87 @@ class Solver:
                     logger.error(f"Failed to load page: {e}")
                     break
 
-                # 2. Analyze with LLM
-                prompt = (
-                    f"You are solving a quiz. Current URL: {current_url}\n"
-                    f"Page Text:\n{text_content[:8000]}\n"
-                    f"Links:\n{str(links)[:2000]}\n"
-                    "Analyze the page. If there is a question, solve it. "
-                    "If you need to download a file or run code, do so. "
-                    "If you have the answer, submit it. "
-                    "Provide your response as a valid JSON object matching the LLMAction schema."
-                )
-
-                system_prompt = (
-                     "You are an autonomous solver agent. Available actions: "
-                     "'code' (run python), 'download' (url), 'submit' (submit answer), 'wait'. "
-                     "Return JSON ONLY. "
-                     f"IMPORTANT: The submission URL is almost always '{DEFAULT_SUBMIT_URL}'. "
-                     "Use that unless the page explicitly says otherwise. "
-                     "If the page says 'Start by POSTing', your FIRST action should be to 'submit'. "
-                     "For the start step, the 'answer' is typically an empty string."
-                )
+                # 2. Trivial steps (start page, explicit answer, ...) skip the LLM entirely.
+                # Only on the first visit to a URL: reloads after tool turns show the same page,
+                # and if the rule's answer was wrong, the LLM takes over.
+                turn = None
+                planned_rule = None
+                if current_url not in self.planner_tried_urls:
+                    self.planner_tried_urls.add(current_url)
+                    planned = self.planner.plan(current_url, text_content, links)
+                    if planned:
+                        planned_rule, action = planned
+                        logger.info(f"Pre-planner rule '{planned_rule}' matched; skipping LLM call")
+                        turn = LLMTurn(actions=[action])
+
+                if not turn:
+                    # 2b. Otherwise analyze with LLM
+                    prompt = (
+                        f"You are solving a quiz. Current URL: {current_url}\n"
+                        f"Page Text:\n{text_content[:8000]}\n"
+                        f"Links:\n{str(links)[:2000]}\n"
+                        "Analyze the page. If there is a question, solve it. "
+                        "If you need to download a file or run code, do so. "
+                        "If you have the answer, submit it. "
+                        "Provide your response as valid JSON: a single action object, or {\"actions\": [...]} for several."
+                    )
+
+                    system_prompt = (
+                         "You are an autonomous solver agent. Available actions: "
+                         "'code' (run python), 'download' (url), 'submit' (submit answer), 'wait'. "
+                         "Return JSON ONLY. "
+                         "You may return several actions at once as {\"actions\": [...]}. "
+                         "Give each action an 'id' and list in 'depends_on' the ids it needs first; "
+                         "actions without dependencies run in parallel. "
+                         "Downloads are saved as 'downloads/<file name from the URL>'; if two downloads in one turn "
+                         "share a file name, the later ones are saved as 'downloads/<stem>_<id><ext>'. "
+                         "Only include 'submit' once you know the answer. "
+                         f"IMPORTANT: The submission URL is almost always '{DEFAULT_SUBMIT_URL}'. "
+                         "Use that unless the page explicitly says otherwise. "
+                         "If the page says 'Start by POSTing', your FIRST action should be to 'submit'. "
+                         "For the start step, the 'answer' is typically an empty string."
+                    )
                 
-                max_retries = 3
-                action_data = None
+                    max_retries = 3
                 
-                for _ in range(max_retries):
-                    response_text = await ask_llm(prompt, self.history, system_prompt)
-                    try:
-                        # loose json parsing
-                        clean_text = response_text.strip().replace("```json", "").replace("```", "")
-                        data = json.loads(clean_text)
-                        # Validate with pydantic
-                        action_data = LLMAction(**data)
-                        break
-                    except Exception as e:
-                        logger.warning(f"Failed to parse LLM response: {e}. Retrying...")
+                    for _ in range(max_retries):
+                        response_text = await ask_llm(prompt, self.history, system_prompt)
+                        try:
+                            # loose json parsing
+                            clean_text = response_text.strip().replace("```json", "").replace("```", "")
+                            data = json.loads(clean_text)
+                            # Validate with pydantic
+                            turn = self.parse_turn(data)
+                            break
+                        except Exception as e:
+                            logger.warning(f"Failed to parse LLM response: {e}. Retrying...")
                 
-                if not action_data:
-                    logger.error("LLM failed to produce valid action.")
-                    break
+                    if not turn:
+                        logger.error("LLM failed to produce valid action.")
+                        break
 
-                logger.info(f"LLM Action: {action_data.action}")
-                
-                # 3. Execute Action
-                if action_data.action == "code":
-                    output = self.executor.execute(action_data.code)
-                    self.history.append({"role": "user", "content": f"Code Output: {output}"})
+                logger.info(f"Actions: {[a.action for a in turn.actions]}")
                 
-                elif action_data.action == "download":
-                    path = self.downloader.download(action_data.url)
-                    content = f"File downloaded to {path}"
-                    logger.info(f"Downloaded file: {path}")
-
-                    # Handle Images
-                    if path.endswith(".png") or path.endswith(".jpg"):
-                         ocr_text = extract_text_from_image(path)
-                         content += f"\nOCR Content: {ocr_text}"
-                    
-                    # Handle Audio with Transcription
-                    # Heuristic: Check extension OR if the task itself is an audio task
-                    is_audio_task = "audio" in current_url.lower()
-                    if path.endswith(".mp3") or path.endswith(".wav") or is_audio_task:
-                         logger.info(f"Transcribing audio file: {path} (Task audio: {is_audio_task})")
-                         transcript = transcribe_audio(path)
-                         content += f"\n[AUDIO TRANSCRIPT]: {transcript}"
-                         logger.info(f"Transcription result: {transcript[:50]}...")
-                    
-                    # Add to history so LLM knows it's done
-                    self.history.append({"role": "user", "content": content})
-                    
+                # 3. Execute tool actions (code/download) concurrently, respecting depends_on
+                tool_actions = [a for a in turn.actions if a.action in ("code", "download")]
+                if tool_actions:
+                    outputs = await self.run_actions(tool_actions, current_url)
+                    # Merge in the order the LLM declared them, not completion order
+                    for output in outputs:
+                        self.history.append({"role": "user", "content": output})
+
                     # CRITICAL: Force a small sleep or state change so we don't hammer the LLM 
                     # causing rate limits in a tight loop if it decides to download again.
-                    await asyncio.sleep(2)
+                    # Once per turn, regardless of how many files were fetched.
+                    if any(a.action == "download" for a in tool_actions):
+                        await asyncio.sleep(2)
+
+                # 4. Terminal action: at most one submit/wait per turn
+                action_data = next((a for a in turn.actions if a.action in ("submit", "wait")), None)
+                if not action_data:
+                    continue
 
-                elif action_data.action == "submit":
+                if action_data.action == "submit":
                     # Construct submission
                     submit_url = action_data.submit_url
                     
@@ -158,7 +168,7 @@ class Solver:
                                         self.history = [] 
                                     else:
                                         logger.info("Quiz finished successfully! (No next URL returned)")
-                                        return
+                                        current_url = None # Ends the main loop
                                     success = True
                                     break # Exit candidate loop
                                 
@@ -171,6 +181,10 @@ class Solver:
                                     self.history.append({"role": "user", "content": f"Wrong answer. Server said: {result}"})
                                     break # Don't try other candidates if it's just 'wrong' logic
                     
+                    # Only accepted planner answers count as saved LLM calls
+                    if planned_rule:
+                        self.planner.record_outcome(planned_rule, success)
+
                     if success:
                         continue # Move to next main loop iteration
 
@@ -184,3 +198,113 @@ class Solver:
             # Never crash the server, just log
         finally:
             await self.browser.close()
+
+    @staticmethod
+    def parse_turn(data) -> LLMTurn:
+        """
+        Accepts a single action object, a bare list of actions, or {"actions": [...]}.
+        Actions without an id (or with a repeated one) get a fresh id that no other action uses.
+        """
+        if isinstance(data, list):
+            items = data
+        elif isinstance(data, dict) and "actions" in data:
+            items = data["actions"]
+        else:
+            items = [data]
+
+        turn = LLMTurn(actions=[LLMAction(**item) for item in items])
+        if not turn.actions:
+            raise ValueError("No actions in LLM response")
+        # Explicit ids are reserved up front so generated ones can't shadow them
+        taken = {a.id for a in turn.actions if a.id}
+        seen = set()
+        for i, action in enumerate(turn.actions):
+            if not action.id or action.id in seen:
+                new_id, n = str(i), 1
+                while new_id in taken:
+                    new_id, n = f"{i}_{n}", n + 1
+                action.id = new_id
+                taken.add(new_id)
+            seen.add(action.id)
+        return turn
+
+    async def run_actions(self, actions: list, current_url: str) -> list:
+        """
+        Runs actions in waves: each wave holds every action whose dependencies have
+        finished, and its members run concurrently. Returns outputs in input order.
+        """
+        ids = {a.id for a in actions}
+        done = set()
+        outputs = [None] * len(actions)
+        pending = list(enumerate(actions))
+        tags = self.download_tags(actions)
+
+        while pending:
+            # Dependencies outside this turn (e.g. on a submit) can't be waited on; ignore them
+            ready = [(i, a) for i, a in pending if all(d in done or d not in ids for d in a.depends_on)]
+            if not ready:
+                logger.warning(f"Dependency cycle among {[a.id for _, a in pending]}. Running them together.")
+                ready = pending
+
+            # One failing action must not sink its siblings or the whole quiz
+            results = await asyncio.gather(
+                *(self.run_action(a, current_url, tags.get(i)) for i, a in ready),
+                return_exceptions=True
+            )
+            for (i, action), output in zip(ready, results):
+                if isinstance(output, Exception):
+                    logger.error(f"Action {action.id} failed: {output}")
+                    output = f"Error [{action.id}]: {output}"
+                outputs[i] = output
+                done.add(action.id)
+            finished = {i for i, _ in ready}
+            pending = [(i, a) for i, a in pending if i not in finished]
+
+        return outputs
+
+    def download_tags(self, actions: list) -> dict:
+        """
+        Downloads keep their plain file name, so code in the same turn can refer to it.
+        Only when a name is already taken in this turn does the later download get
+        its action id (or, failing that, its position) as a suffix.
+        """
+        tags = {}
+        taken = set()
+        for i, action in enumerate(actions):
+            if action.action != "download" or not action.url:
+                continue
+            for tag in (None, action.id, f"{action.id}_{i}"):
+                filename = self.downloader.filename_for(action.url, tag)
+                if filename not in taken:
+                    break
+            taken.add(filename)
+            if tag:
+                tags[i] = tag
+        return tags
+
+    async def run_action(self, action: LLMAction, current_url: str, tag: str = None) -> str:
+        # Blocking tools run in worker threads so independent actions overlap
+        if action.action == "code":
+            output = await asyncio.to_thread(self.executor.execute, action.code)
+            return f"Code Output [{action.id}]: {output}"
+
+        # Tagged only on a name clash, so concurrent downloads never share a path
+        path = await asyncio.to_thread(self.downloader.download, action.url, tag)
+        content = f"File [{action.id}] downloaded to {path}"
+        logger.info(f"Downloaded file: {path}")
+
+        # Handle Images
+        if path.endswith(".png") or path.endswith(".jpg"):
+             ocr_text = await asyncio.to_thread(extract_text_from_image, path)
+             content += f"\nOCR Content: {ocr_text}"
+        
+        # Handle Audio with Transcription
+        # Heuristic: Check extension OR if the task itself is an audio task
+        is_audio_task = "audio" in current_url.lower()
+        if path.endswith(".mp3") or path.endswith(".wav") or is_audio_task:
+             logger.info(f"Transcribing audio file: {path} (Task audio: {is_audio_task})")
+             transcript = await asyncio.to_thread(transcribe_audio, path)
+             content += f"\n[AUDIO TRANSCRIPT]: {transcript}"
+             logger.info(f"Transcription result: {transcript[:50]}...")
+
+        return content
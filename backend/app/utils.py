@@ -1,4 +1,5 @@
 import os
+import re
 import requests
 import subprocess
 import aiohttp
@@ -12,17 +13,25 @@ class FileDownloader:
         if not os.path.exists(download_dir):
             os.makedirs(download_dir)
 
-    def download(self, url: str) -> str:
-        try:
-            filename = os.path.basename(url.split("?")[0])
-            if not filename:
-                filename = f"file_{uuid.uuid4()}"
-            
-            # Simple extension check basic fix
-            if "." not in filename:
-                filename += ".dat"
+    def filename_for(self, url: str, tag: str = None) -> str:
+        filename = os.path.basename(url.split("?")[0])
+        if not filename:
+            filename = f"file_{uuid.uuid4()}"
+        
+        # Simple extension check basic fix
+        if "." not in filename:
+            filename += ".dat"
 
-            path = os.path.join(self.download_dir, filename)
+        # Optional tag keeps the extension last: data.csv -> data_<tag>.csv
+        if tag:
+            stem, ext = os.path.splitext(filename)
+            safe_tag = re.sub(r"[^\w-]", "_", tag)
+            filename = f"{stem}_{safe_tag}{ext}"
+        return filename
+
+    def download(self, url: str, tag: str = None) -> str:
+        try:
+            path = os.path.join(self.download_dir, self.filename_for(url, tag))
             
             response = requests.get(url, stream=True)
             response.raise_for_status()